@@ -1,6 +1,8 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import io
+from openpyxl import load_workbook
 from datetime import datetime, date
 
 # Set page configuration
@@ -56,18 +58,192 @@ events_df = st.data_editor(
 # ==========================================
 # HELPER FUNCTIONS
 # ==========================================
-def format_travel_time(date_val, time_val):
+# Report columns the tool reads; everything else is dropped at load time
+REPORT_COLUMNS = {
+    'Traveler Name', 'Arrival City', 'Departure City Name',
+    'Arrival Date', 'Arrival Time', 'Departure Date', 'Departure Time',
+    'Airline Code', 'Flight Number', 'Arrive Airport', 'Depart Airport'
+}
+
+# Columns each side of the arrival/departure join contributes to the report
+ARRIVAL_COLUMNS = ['Traveler Name', 'Departure City Name', 'Arrival Formatted', 'Flight', 'Arrive Airport']
+DEPARTURE_COLUMNS = ['Traveler Name', 'Departure Formatted', 'Flight', 'Depart Airport']
+
+def format_travel_times(date_col, time_col):
     """
-    Takes raw date and time and converts to format: Friday March 19 12:36 pm
+    Takes date and time columns and converts them to format: Friday March 19 12:36 pm
+    Values that can't be parsed fall back to the raw date and time.
     """
-    try:
-        d_str = str(date_val).split(' ')[0]
-        t_str = str(time_val)
-        dt = pd.to_datetime(f"{d_str} {t_str}")
-        formatted_str = dt.strftime("%A %B %d %I:%M %p")
-        return formatted_str.replace("AM", "am").replace("PM", "pm")
-    except:
-        return f"{date_val} {time_val}"
+    dt = pd.to_datetime(date_col.dt.strftime('%Y-%m-%d') + ' ' + time_col.astype(str), format='mixed', errors='coerce')
+    formatted = dt.dt.strftime("%A %B %d %I:%M %p")
+    formatted = formatted.str.replace("AM", "am").str.replace("PM", "pm")
+    raw = (date_col.astype(str) + ' ' + time_col.fillna('').astype(str)).str.strip()
+    return formatted.fillna(raw)
+
+def flight_labels(frame):
+    """
+    Builds 'Airline Code Flight Number' labels for every row, e.g. WN 1234
+    A missing code or number is left out rather than blanking the whole label.
+    """
+    labels = frame['Airline Code'].fillna('').astype(str) + ' ' + frame['Flight Number'].fillna('').astype(str)
+    return labels.str.strip()
+
+def index_by_city_day(df, city_col, day_col):
+    """
+    Sorts rows by (city, day) and maps each city to its block of row positions.
+    Returns (sorted frame, {city: positions}, sorted day values). The sorted frame keeps the
+    report's index so selected rows can be put back in report order.
+    """
+    ordered = df.sort_values([city_col, day_col], kind='stable')
+    city_rows = ordered.groupby(city_col, observed=True).indices
+    days = ordered[day_col].to_numpy(dtype='datetime64[ns]')
+    return ordered, city_rows, days
+
+def rows_for_event(city_day_index, cities, start_ts, end_ts):
+    """
+    Takes the rows for the given cities and date range, skipping cities not in the report.
+    """
+    ordered, city_rows, days = city_day_index
+    if pd.isna(start_ts) or pd.isna(end_ts):
+        return ordered.iloc[0:0]
+    start = np.datetime64(start_ts, 'ns')
+    end = np.datetime64(end_ts, 'ns')
+
+    positions = []
+    for city in dict.fromkeys(cities):
+        rows = city_rows.get(city)
+        if rows is None:
+            continue
+        # A city's rows are contiguous and sorted by day, so the date range is a binary search
+        first = rows[0]
+        block = days[first:rows[-1] + 1]
+        lo = np.searchsorted(block, start, side='left')
+        hi = np.searchsorted(block, end, side='right')
+        positions.append(np.arange(first + lo, first + hi))
+
+    if not positions:
+        return ordered.iloc[0:0]
+    # The sort is only a lookup structure; show travelers in the report's own order
+    return ordered.take(np.concatenate(positions)).sort_index()
+
+def event_rows(event, arr_by_city_day, dep_by_city_day):
+    """
+    Selects one event's arrival rows and first departure per traveler, tagged with the event's index.
+    """
+    index, _, target_cities, start_date, end_date = event
+    start_ts = pd.Timestamp(start_date)
+    end_ts = pd.Timestamp(end_date)
+
+    # Filter Arrivals (Destination matches City List AND Date in Range)
+    arrivals = rows_for_event(arr_by_city_day, target_cities, start_ts, end_ts)
+
+    # Filter Departures (Origin matches City List AND Date in Range)
+    departures = rows_for_event(dep_by_city_day, target_cities, start_ts, end_ts)
+    # Keep one departure per traveler (their earliest) so the join side carries no duplicates
+    departures = departures.sort_values('Departure Date', kind='stable').drop_duplicates('Traveler Name', keep='first')
+
+    return arrivals[ARRIVAL_COLUMNS].assign(Event=index), departures[DEPARTURE_COLUMNS].assign(Event=index)
+
+def needed_column(col):
+    """
+    usecols filter that keeps only REPORT_COLUMNS, ignoring stray whitespace in headers.
+    """
+    return str(col).strip() in REPORT_COLUMNS
+
+def read_csv_arrow(csv_bytes, usecols):
+    """
+    Parses CSV bytes with pyarrow's multi-threaded reader into Arrow-backed columns.
+    Every column is read as text: dates keep their UTC offsets for later parsing, and an
+    all-blank column can't be inferred as a null type. Blank cells stay missing.
+    Rows with the wrong field count raise ArrowInvalid so the caller can fall back to the C engine.
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    table = pa_csv.read_csv(
+        io.BytesIO(csv_bytes),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=usecols,
+            column_types={c: pa.string() for c in usecols},
+            strings_can_be_null=True
+        )
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+@st.cache_data(show_spinner=False)
+def load_report(file_bytes: bytes, name: str) -> pd.DataFrame:
+    """
+    Parses the uploaded report and precomputes derived columns.
+    Cached on the file contents so editing events does not re-parse the file.
+    """
+    header_row_index = 0
+    df = None
+
+    if name.endswith('.csv'):
+        # Locate the header line with a byte search instead of splitting every line
+        if file_bytes.startswith(b"Traveler Name"):
+            header_offset = 0
+        else:
+            idx = file_bytes.find(b"\nTraveler Name")
+            if idx == -1:
+                raise ValueError("Could not find 'Traveler Name' in the CSV.")
+            header_offset = idx + 1
+        # Parse from the header line on rather than passing skiprows
+        csv_bytes = file_bytes[header_offset:]
+        # Resolve needed columns from the header up front; pyarrow only takes a list of names
+        header = pd.read_csv(io.BytesIO(csv_bytes), nrows=0).columns
+        usecols = [c for c in header if needed_column(c)]
+        try:
+            df = read_csv_arrow(csv_bytes, usecols)
+        except (ImportError, ValueError):
+            # pyarrow missing, or a file it can't parse (ArrowInvalid), e.g. short footer lines
+            # or rows missing trailing fields; the C engine fills those with NaN
+            # usecols is applied afterwards: passed to read_csv it would let rows with extra fields
+            # (e.g. an unquoted comma) through misaligned instead of raising a tokenizing error
+            df = pd.read_csv(io.BytesIO(csv_bytes))[usecols]
+
+    elif name.endswith('.xlsx'):
+        # Stream the first column in read-only mode so the workbook is only fully parsed once
+        wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
+        found = False
+        for i, row in enumerate(wb.worksheets[0].iter_rows(values_only=True, max_col=1)):
+            if row and row[0] == "Traveler Name":
+                header_row_index = i
+                found = True
+                break
+        wb.close()
+        if not found:
+            raise ValueError("Could not find 'Traveler Name' in Excel.")
+        try:
+            # Rust-based reader, much faster than openpyxl when python-calamine is installed
+            df = pd.read_excel(io.BytesIO(file_bytes), skiprows=header_row_index, usecols=needed_column, engine='calamine')
+        except ImportError:
+            # python-calamine not installed
+            df = pd.read_excel(io.BytesIO(file_bytes), skiprows=header_row_index, usecols=needed_column, engine='openpyxl')
+
+    # Cleanup
+    df.columns = df.columns.str.strip()
+    for col in ('Arrival Date', 'Departure Date'):
+        df[col] = pd.to_datetime(df[col])
+        # Keep the report's local wall-clock times when dates carry a UTC offset
+        if df[col].dt.tz is not None:
+            df[col] = df[col].dt.tz_localize(None)
+    # Airport columns are optional in the report
+    for col in ('Arrive Airport', 'Depart Airport'):
+        if col not in df.columns:
+            df[col] = '-'
+    # Cities repeat heavily; as categoricals the (city, day) sort and groupby(...).indices
+    # in index_by_city_day work on integer codes instead of strings
+    for col in ('Arrival City', 'Departure City Name'):
+        df[col] = df[col].astype('category')
+    # Calendar days as datetime64, computed once so event filters avoid .dt.date per event
+    df['Arrival Day'] = df['Arrival Date'].dt.normalize()
+    df['Departure Day'] = df['Departure Date'].dt.normalize()
+    # Flight labels are built once up front, before any join can turn unmatched numbers into floats
+    df['Flight'] = flight_labels(df)
+    df['Arrival Formatted'] = format_travel_times(df['Arrival Date'], df['Arrival Time'])
+    df['Departure Formatted'] = format_travel_times(df['Departure Date'], df['Departure Time'])
+    return df
 
 # ==========================================
 # 2. FILE UPLOAD SECTION
@@ -80,111 +256,65 @@ uploaded_file = st.file_uploader("Upload Report", type=['csv', 'xlsx'])
 # ==========================================
 if uploaded_file is not None and not events_df.empty:
     try:
-        header_row_index = 0
-        df = None
-
         # --- LOAD DATA ---
-        if uploaded_file.name.endswith('.csv'):
-            stringio = io.StringIO(uploaded_file.getvalue().decode("utf-8"))
-            lines = stringio.readlines()
-            found = False
-            for i, line in enumerate(lines):
-                if line.startswith("Traveler Name"):
-                    header_row_index = i
-                    found = True
-                    break
-            if not found:
-                st.error("Could not find 'Traveler Name' in the CSV.")
-                st.stop()
-            uploaded_file.seek(0)
-            df = pd.read_csv(uploaded_file, skiprows=header_row_index)
-
-        elif uploaded_file.name.endswith('.xlsx'):
-            temp_df = pd.read_excel(uploaded_file, header=None)
-            match = temp_df[temp_df.iloc[:, 0].astype(str) == "Traveler Name"]
-            if not match.empty:
-                header_row_index = match.index[0]
-                uploaded_file.seek(0)
-                df = pd.read_excel(uploaded_file, skiprows=header_row_index)
-            else:
-                st.error("Could not find 'Traveler Name' in Excel.")
-                st.stop()
-
-        # Cleanup
-        df.columns = df.columns.str.strip()
-        df['Arrival Date'] = pd.to_datetime(df['Arrival Date'])
-        df['Departure Date'] = pd.to_datetime(df['Departure Date'])
+        try:
+            df = load_report(uploaded_file.getvalue(), uploaded_file.name)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
 
         # --- RESULTS ---
         st.divider()
         st.header("3. Results")
 
-        for index, event in events_df.iterrows():
-            event_name = event['Event Name']
-            
-            # Parse Cities and Dates
-            raw_cities = str(event['Cities'])
-            target_cities = [c.strip() for c in raw_cities.split(',')]
-            start_date = event['Start Date']
-            end_date = event['End Date']
-
-            # Filter Arrivals (Destination matches City List AND Date in Range)
-            arrivals = df[
-                (df['Arrival City'].isin(target_cities)) & 
-                (df['Arrival Date'].dt.date >= start_date) & 
-                (df['Arrival Date'].dt.date <= end_date)
-            ].copy()
-
-            # Filter Departures (Origin matches City List AND Date in Range)
-            departures = df[
-                (df['Departure City Name'].isin(target_cities)) & 
-                (df['Departure Date'].dt.date >= start_date) & 
-                (df['Departure Date'].dt.date <= end_date)
-            ].copy()
-
-            if arrivals.empty:
-                continue
-            
-            report_data = []
-
-            for _, row in arrivals.iterrows():
-                name = row['Traveler Name']
-                home_city = row['Departure City Name'] 
-                
-                # Arrival Details
-                arr_formatted = format_travel_time(row['Arrival Date'], row['Arrival Time'])
-                arr_flight = f"{row['Airline Code']} {row['Flight Number']}"
-                arr_airport = row.get('Arrive Airport', '-') # The airport they land AT
-                
-                # Departure Details
-                person_dep = departures[departures['Traveler Name'] == name]
-                
-                if not person_dep.empty:
-                    dep_row = person_dep.iloc[0]
-                    dep_formatted = format_travel_time(dep_row['Departure Date'], dep_row['Departure Time'])
-                    dep_flight = f"{dep_row['Airline Code']} {dep_row['Flight Number']}"
-                    dep_airport = dep_row.get('Depart Airport', '-') # The airport they fly FROM
-                else:
-                    dep_formatted = "No Return Flight"
-                    dep_flight = "-"
-                    dep_airport = "-"
-
-                report_data.append({
-                    "Name": name,
-                    "Home City": home_city,
-                    "Arr Time": arr_formatted,
-                    "Arr Flight": arr_flight,
-                    "Arr Airport": arr_airport,
-                    "Dep Time": dep_formatted,
-                    "Dep Flight": dep_flight,
-                    "Dep Airport": dep_airport
-                })
-            
-            st.subheader(f"{event_name}")
-            st.caption(f"Cities: {', '.join(target_cities)} | Dates: {start_date} to {end_date}")
-            
-            result_df = pd.DataFrame(report_data)
-            st.dataframe(result_df, use_container_width=True, hide_index=True)
+        # Built once so each event is a few dict lookups and binary searches rather than a full-column isin
+        arr_by_city_day = index_by_city_day(df, 'Arrival City', 'Arrival Day')
+        dep_by_city_day = index_by_city_day(df, 'Departure City Name', 'Departure Day')
+
+        # Parse Cities and Dates once per event
+        events = [
+            (index, event['Event Name'], tuple(c.strip() for c in str(event['Cities']).split(',')), event['Start Date'], event['End Date'])
+            for index, event in events_df.iterrows()
+        ]
+
+        # Map every (event, row) pair first, then join and group all events in one pass.
+        # A traveler can belong to more than one event if their cities and dates overlap.
+        event_parts = [event_rows(event, arr_by_city_day, dep_by_city_day) for event in events]
+        arr_parts = [arr_part for arr_part, _ in event_parts]
+        dep_parts = [dep_part for _, dep_part in event_parts]
+
+        # Join each arrival to the traveler's first departure (left join keeps arrivals with no return)
+        merged = pd.concat(arr_parts).merge(
+            pd.concat(dep_parts),
+            on=['Event', 'Traveler Name'],
+            how='left',
+            suffixes=('_arr', '_dep'),
+            indicator=True
+        )
+        has_dep = merged['_merge'] == 'both'
+
+        report_df = pd.DataFrame({
+            "Event": merged['Event'],
+            "Name": merged['Traveler Name'],
+            "Home City": merged['Departure City Name'],
+            "Arr Time": merged['Arrival Formatted'],
+            "Arr Flight": merged['Flight_arr'],
+            "Arr Airport": merged['Arrive Airport'], # The airport they land AT
+            "Dep Time": merged['Departure Formatted'].where(has_dep, "No Return Flight"),
+            "Dep Flight": merged['Flight_dep'].where(has_dep, "-"),
+            "Dep Airport": merged['Depart Airport'].where(has_dep, "-") # The airport they fly FROM
+        })
+        event_reports = dict(tuple(report_df.groupby('Event', sort=False)))
+
+        # One tab per event with travelers, instead of stacking every table on the page
+        found_events = [e for e in events if e[0] in event_reports]
+        if found_events:
+            tabs = st.tabs([f"{event_name}" for _, event_name, _, _, _ in found_events])
+            for tab, (index, event_name, target_cities, start_date, end_date) in zip(tabs, found_events):
+                with tab:
+                    st.caption(f"Cities: {', '.join(target_cities)} | Dates: {start_date} to {end_date}")
+                    result_df = event_reports[index].drop(columns='Event')
+                    st.dataframe(result_df, use_container_width=True, hide_index=True)
 
     except Exception as e:
         st.error(f"An error occurred: {e}")